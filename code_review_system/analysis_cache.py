@@ -0,0 +1,94 @@
+"""
+Analysis Cache
+Content-addressed cache for analyze_code results: a small in-memory LRU in
+front of an on-disk SQLite store
+"""
+
+import copy
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'code_review', 'analyzer.sqlite')
+MEMORY_CACHE_SIZE = 128  # Entries kept in-process, bounding RAM use
+
+_connection = None
+_connection_pid = None
+_lock = threading.Lock()
+_memory = OrderedDict()
+
+def _connect():
+    global _connection, _connection_pid
+    # SQLite connections must not be shared across fork()
+    if _connection is None or _connection_pid != os.getpid():
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        connection = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value BLOB)')
+        _connection = connection
+        _connection_pid = os.getpid()
+    return _connection
+
+def _make_key(sha, key_tuple):
+    return hashlib.sha256(sha + repr(key_tuple).encode('utf-8')).digest()
+
+def _remember(key, value):
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+def clear_memory():
+    """Drop the in-memory entries; the on-disk store is left untouched"""
+    with _lock:
+        _memory.clear()
+
+def get(sha, key_tuple):
+    """
+    Look up a cached analysis result
+
+    Args:
+        sha (bytes): SHA-256 digest of the analyzed source
+        key_tuple (tuple): Tool versions and file name the result was produced with
+
+    Returns:
+        dict or None: The cached result, or None on a miss or unreadable entry
+    """
+    key = _make_key(sha, key_tuple)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            # Hand out a copy so callers cannot mutate the cached entry
+            return copy.deepcopy(_memory[key])
+
+    try:
+        with _lock:
+            row = _connect().execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+    except (sqlite3.Error, OSError):
+        return None
+    if row is None:
+        return None
+    try:
+        value = pickle.loads(row[0])
+    except Exception:
+        return None
+    _remember(key, value)
+    return copy.deepcopy(value)
+
+def put(sha, key_tuple, value):
+    """Store an analysis result; failures are ignored since the cache is best-effort"""
+    key = _make_key(sha, key_tuple)
+    _remember(key, copy.deepcopy(value))
+    try:
+        data = pickle.dumps(value)
+        with _lock:
+            connection = _connect()
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)',
+                                   (key, data))
+    except (sqlite3.Error, OSError, pickle.PicklingError):
+        pass
@@ -1,100 +1,421 @@
 import subprocess
 import json
-import radon.complexity as radon_complexity
-import radon.metrics as radon_metrics
 import ast
+import hashlib
+import io
+from functools import lru_cache
 import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pylint
+from astroid import MANAGER
+from pylint import checkers
+from pylint.checkers.clear_lru_cache import clear_lru_caches
+from pylint.lint import PyLinter, Run
+from pylint.reporters import CollectingReporter
+import analysis_cache
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Bump ANALYZER_VERSION whenever the scoring rules below change so stale cache entries are ignored
+ANALYZER_VERSION = 7
+CACHE_KEY = (ANALYZER_VERSION, pylint.__version__, tuple(sys.version_info))
+
+# pylint exit status bits that mean the run itself broke rather than found issues
+PYLINT_FATAL = 1
+PYLINT_USAGE_ERROR = 32
+
+# Set CODE_REVIEW_PYLINT_SUBPROCESS=1 to run pylint as a separate process instead of in-process
+USE_PYLINT_SUBPROCESS = os.environ.get('CODE_REVIEW_PYLINT_SUBPROCESS', '') not in ('', '0')
+PIPE_BUFFER_SIZE = 1 << 16
+
+# Checkers whose results we do not score: duplicate-code (the costly similarities
+# checker), spelling (needs a dictionary) and too-many-lines (our own file length
+# rule already covers it). The score and report sections are never read either.
+PYLINT_ARGS = ['--disable=duplicate-code,spelling,too-many-lines', '--score=n', '--reports=n']
+
+SNAKE_CASE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Points deducted per pylint message, by message type
+PENALTY = {'error': 10, 'warning': 5, 'convention': 2, 'refactor': 2, 'info': 2}
+DEFAULT_PENALTY = 2
+
+def warm_up():
+    """Import all of pylint's checkers up front, e.g. when a worker process starts"""
+    checkers.initialize(PyLinter())
 
 def analyze_code(filepath):
-    issues = []
-    suggestions = []
-    score = 100  # Start with perfect score
+    return analyze_code_batch([filepath])[0]
+
+def analyze_source(code, filename='snippet.py'):
+    """Analyze source held in memory; filename is what pylint and the report call it"""
+    sha = hashlib.sha256(code.encode('utf-8')).digest()
+    # Some pylint messages depend on the module name (e.g. C0103 on the file name)
+    key = CACHE_KEY + (filename,)
+    cached = analysis_cache.get(sha, key)
+    if cached is not None:
+        return _make_result(filename, code, cached['issues'], cached['score'], cached['suggestions'])
+
+    code_lines = code.splitlines()
+    if USE_PYLINT_SUBPROCESS:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # pylint runs in the background (waiting on its subprocess with the GIL
+            # released) while the AST checks run here
+            pylint_future = executor.submit(_lint_source, code, filename)
+            source_checks = _check_source(code, code_lines)
+            pylint_output = pylint_future.result()
+    else:
+        # In-process pylint holds the GIL, so there is nothing to overlap with
+        source_checks = _check_source(code, code_lines)
+        pylint_output = _lint_source(code, filename)
+    issues, score, suggestions = _combine(pylint_output, source_checks)
+    analysis_cache.put(sha, key, {'issues': issues, 'score': score, 'suggestions': suggestions})
+    return _make_result(filename, code, issues, score, suggestions, code_lines)
+
+def get_cached_analysis(filepath):
+    """Return the cached result for a file, or None if it still has to be analyzed"""
+    return _cached_result(filepath, *_read_source(filepath))
+
+def analyze_code_batch(filepaths):
+    sources = [_read_source(filepath) for filepath in filepaths]
+    results = [_cached_result(filepath, *source) for filepath, source in zip(filepaths, sources)]
+    misses = [index for index, result in enumerate(results) if result is None]
+    if not misses:
+        return results
+
+    def check_sources():
+        checked = {}
+        for index in misses:
+            code = sources[index][0]
+            code_lines = code.splitlines()
+            checked[index] = (code_lines, _check_source(code, code_lines))
+        return checked
+
+    miss_paths = [filepaths[index] for index in misses]
+    if USE_PYLINT_SUBPROCESS or len(misses) > 1:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # pylint runs in the background (mostly waiting on its worker processes or
+            # subprocess with the GIL released) while the AST checks run here
+            pylint_future = executor.submit(_lint, miss_paths)
+            checked = check_sources()
+            pylint_results = pylint_future.result()
+    else:
+        # A single file linted in-process holds the GIL, so there is nothing to overlap with
+        checked = check_sources()
+        pylint_results = _lint(miss_paths)
+
+    for index in misses:
+        filepath = filepaths[index]
+        code, sha, key = sources[index]
+        code_lines, source_checks = checked[index]
+        issues, score, suggestions = _combine(pylint_results[os.path.abspath(filepath)], source_checks)
+        analysis_cache.put(sha, key, {'issues': issues, 'score': score, 'suggestions': suggestions})
+        results[index] = _make_result(os.path.basename(filepath), code, issues, score, suggestions, code_lines)
+    return results
+
+def _read_source(filepath):
+    """Return (source, digest, cache key) for a file, reading it only once"""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    # Some pylint messages depend on the module name (e.g. C0103 on the file name)
+    return data.decode('utf-8', 'replace'), hashlib.sha256(data).digest(), CACHE_KEY + (os.path.basename(filepath),)
 
-    # Run pylint
+def _cached_result(filepath, code, sha, key):
+    cached = analysis_cache.get(sha, key)
+    if cached is None:
+        return None
+    return _make_result(os.path.basename(filepath), code, cached['issues'], cached['score'], cached['suggestions'])
+
+class AnalysisResult(dict):
+    """Result dict whose 'code_lines' entry is split out of the source only when first read"""
+
+    def __init__(self, source, **fields):
+        super().__init__(**fields)
+        self.source = source
+
+    def __missing__(self, key):
+        if key != 'code_lines':
+            raise KeyError(key)
+        code_lines = self.source.splitlines()
+        self['code_lines'] = code_lines
+        return code_lines
+
+def _make_result(filename, code, issues, score, suggestions, code_lines=None):
+    result = AnalysisResult(
+        code,
+        filename=filename,
+        issues=issues,
+        score=score,
+        suggestions=suggestions,
+        line_suggestions={}  # For future enhancement
+    )
+    if code_lines is not None:
+        result['code_lines'] = code_lines
+    return result
+
+@lru_cache(maxsize=32)
+def parse_code(code):
+    """Parse source into an AST, memoized so callers holding the same source share one tree"""
+    return ast.parse(code)
+
+def _lint(filepaths):
+    """Map each file's absolute path to its pylint messages, or to the exception pylint raised"""
     try:
-        result = subprocess.run(['pylint', '--output-format=json', filepath],
-                              capture_output=True, text=True)
-        pylint_output = json.loads(result.stdout)
-        for issue in pylint_output:
-            issues.append({
-                'type': issue['type'],
-                'message': issue['message'],
-                'line': issue['line']
-            })
-            # Deduct points based on severity
-            if issue['type'] == 'error':
-                score -= 10
-            elif issue['type'] == 'warning':
-                score -= 5
-            else:
-                score -= 2
+        return _lint_batch(filepaths)
     except Exception as e:
-        issues.append({'type': 'error', 'message': f'Pylint failed: {str(e)}', 'line': 0})
+        if len(filepaths) == 1:
+            return {os.path.abspath(filepaths[0]): e}
+
+    # The parallel run broke (e.g. a module astroid cannot load aborts the worker pool),
+    # so fall back to linting the files one at a time
+    pylint_results = {}
+    for filepath in filepaths:
+        pylint_results.update(_lint([filepath]))
+    return pylint_results
 
-    # Analyze complexity with radon
+def _lint_source(code, filename):
+    """Return pylint's messages for in-memory source, or the exception pylint raised"""
     try:
-        with open(filepath, 'r') as f:
-            code = f.read()
-        complexity = radon_complexity.cc_visit(code)
-        for func in complexity:
-            if func.complexity > 10:
-                issues.append({
-                    'type': 'warning',
-                    'message': f'High complexity in {func.name}: {func.complexity}',
-                    'line': func.lineno
-                })
-                score -= 5
-                suggestions.append(f'Refactor {func.name} to reduce complexity')
-
-        # Raw metrics
-        raw_metrics = radon_metrics.raw_metrics(code)
-        if raw_metrics.loc > 100:  # Lines of code
-            issues.append({'type': 'info', 'message': f'File is quite long: {raw_metrics.loc} lines', 'line': 0})
-            score -= 5
-            suggestions.append('Consider breaking down the file into smaller modules')
+        return _run_pylint(['--from-stdin', filename], stdin=code.encode('utf-8'))[1]
     except Exception as e:
-        issues.append({'type': 'error', 'message': f'Complexity analysis failed: {str(e)}', 'line': 0})
+        return e
 
-    # Basic AST analysis for naming conventions
+def _lint_batch(filepaths):
+    args = list(filepaths)
+    if len(filepaths) > 1:
+        args.append('--jobs=0')  # Let pylint fan the files out across all cores
+    status, pylint_output = _run_pylint(args)
+    if len(filepaths) > 1 and status & (PYLINT_FATAL | PYLINT_USAGE_ERROR):
+        raise RuntimeError(f'pylint exited with status {status}')
+
+    pylint_results = {os.path.abspath(filepath): [] for filepath in filepaths}
+    for issue in pylint_output:
+        pylint_results.setdefault(os.path.abspath(issue['path']), []).append(issue)
+    return pylint_results
+
+def _run_pylint(args, stdin=None):
+    if USE_PYLINT_SUBPROCESS:
+        return _run_pylint_subprocess(args, stdin)
+    return _run_pylint_in_process(args, stdin)
+
+def _run_pylint_in_process(args, stdin=None):
+    # Skips the interpreter start-up and pylint/astroid import on every call, and
+    # keeps astroid's trees of the stdlib and site-packages warm between calls
+    reporter = CollectingReporter()
+    saved_stdin = sys.stdin
+    if stdin is not None:
+        # --from-stdin re-wraps sys.stdin.detach(), so it needs a real TextIOWrapper
+        sys.stdin = io.TextIOWrapper(io.BytesIO(stdin), encoding='utf-8')
     try:
-        tree = ast.parse(code)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                if not node.name.islower() or '_' not in node.name:
-                    issues.append({
-                        'type': 'warning',
-                        'message': f'Function name {node.name} does not follow snake_case convention',
-                        'line': node.lineno
-                    })
-                    score -= 2
-                    suggestions.append(f'Rename {node.name} to follow snake_case')
-            elif isinstance(node, ast.ClassDef):
-                if not node.name.istitle():
-                    issues.append({
-                        'type': 'warning',
-                        'message': f'Class name {node.name} does not follow PascalCase convention',
-                        'line': node.lineno
-                    })
-                    score -= 2
-                    suggestions.append(f'Rename {node.name} to follow PascalCase')
-    except SyntaxError as e:
-        issues.append({'type': 'error', 'message': f'Syntax error: {str(e)}', 'line': e.lineno})
-        score -= 20
+        run = Run(PYLINT_ARGS + args, reporter=reporter, exit=False)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else PYLINT_USAGE_ERROR, []
+    finally:
+        sys.stdin = saved_stdin
+        _forget_linted_modules([arg for arg in args if not arg.startswith('-')])
+    return run.linter.msg_status, [
+        {'type': message.category, 'message': message.msg, 'line': message.line, 'path': message.abspath}
+        for message in reporter.messages
+    ]
+
+def _forget_linted_modules(filepaths):
+    """
+    Drop the linted files, and the modules next to them, from astroid's caches
+
+    Otherwise a file re-uploaded under the same name (or a sibling it imports)
+    would be linted from its stale cached tree. Every other parsed module, the
+    stdlib and site-packages included, is put back so the next run starts warm.
+    """
+    directories = {os.path.dirname(os.path.abspath(filepath)) for filepath in filepaths}
+    kept = {
+        name: module for name, module in MANAGER.astroid_cache.items()
+        if getattr(module, 'file', None) is None
+        or os.path.dirname(os.path.abspath(module.file)) not in directories
+    }
+    # clear_cache also resets the import lookup and inference caches, so a sibling
+    # uploaded later is found; rebuilding builtins is skipped since it is put back too
+    clear_lru_caches()
+    MANAGER.bootstrap = lambda: None
+    try:
+        MANAGER.clear_cache()
+    finally:
+        del MANAGER.bootstrap
+    MANAGER.astroid_cache.update(kept)
+
+def _run_pylint_subprocess(args, stdin=None):
+    # Read the report as raw bytes through a large pipe buffer and decode it in one go;
+    # stderr is discarded rather than buffered since it was never used
+    with subprocess.Popen(['pylint', '--output-format=json'] + PYLINT_ARGS + args,
+                          stdin=subprocess.PIPE if stdin is not None else None,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          bufsize=PIPE_BUFFER_SIZE) as process:
+        data = process.communicate(stdin)[0]
+    return process.returncode, json_loads(data or b'[]')
+
+def _combine(pylint_output, source_checks):
+    issues, penalty, suggestions = source_checks
+    score = 100 - penalty  # Start with perfect score
 
+    # Collect pylint results
+    if isinstance(pylint_output, Exception):
+        issues = [{'type': 'error', 'message': f'Pylint failed: {str(pylint_output)}', 'line': 0}] + issues
+    else:
+        issues = [{'type': issue['type'], 'message': issue['message'], 'line': issue['line']}
+                  for issue in pylint_output] + issues
+        # Deduct points based on severity
+        score -= sum(PENALTY.get(issue['type'], DEFAULT_PENALTY) for issue in pylint_output)
+
+    # Stable sort, so issues on the same line keep pylint-then-analyzer order
+    issues.sort(key=lambda issue: issue['line'] or 0)
     score = max(0, score)  # Ensure score doesn't go below 0
 
-    # Read code lines for display
+    return issues, score, suggestions
+
+def _check_source(code, code_lines):
+    """Run the analyzer's own AST and length checks, returning (issues, penalty, suggestions)"""
+    issues = []
+    suggestions = []
+    penalty = 0
+
+    # Single parse; only definitions and the statements inside them are visited
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            code_lines = f.read().splitlines()
-    except Exception as e:
-        code_lines = []
-
-    return {
-        'filename': os.path.basename(filepath),
-        'issues': issues,
-        'score': score,
-        'suggestions': suggestions,
-        'code_lines': code_lines,
-        'line_suggestions': {}  # For future enhancement
-    }
+        tree = parse_code(code)
+        definitions = list(iter_defs(tree))
+        blocks = _complexity_blocks(tree)
+    except SyntaxError as e:
+        issues.append({'type': 'error', 'message': f'Syntax error: {str(e)}', 'line': e.lineno})
+        penalty += 20
+        definitions = []
+        blocks = []
+
+    for node, complexity in blocks:
+        if complexity > 10:
+            issues.append({
+                'type': 'warning',
+                'message': f'High complexity in {node.name}: {complexity}',
+                'line': node.lineno
+            })
+            penalty += 5
+            suggestions.append(f'Refactor {node.name} to reduce complexity')
+
+    loc = len(code_lines)
+    if loc > 100:  # Lines of code
+        issues.append({'type': 'info', 'message': f'File is quite long: {loc} lines', 'line': 0})
+        penalty += 5
+        suggestions.append('Consider breaking down the file into smaller modules')
+
+    # Naming conventions
+    for node in definitions:
+        if isinstance(node, ast.ClassDef):
+            if node.name.istitle():
+                continue
+            kind, convention = 'Class', 'PascalCase'
+        else:
+            if SNAKE_CASE.match(node.name):
+                continue
+            kind, convention = 'Function', 'snake_case'
+        issues.append({
+            'type': 'warning',
+            'message': f'{kind} name {node.name} does not follow {convention} convention',
+            'line': node.lineno
+        })
+        penalty += 2
+        suggestions.append(f'Rename {node.name} to follow {convention}')
+
+    return issues, penalty, suggestions
+
+def iter_defs(tree):
+    """Yield every function and class definition, walking statement bodies only"""
+    pending = deque(tree.body)
+    while pending:
+        node = pending.popleft()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node
+        # Definitions can only appear in statement lists, so expressions are never entered
+        for field in ('body', 'orelse', 'handlers', 'finalbody', 'cases'):
+            pending.extend(getattr(node, field, ()))
+
+def _outer_defs(statements):
+    """Yield the definitions in a statement list, without descending into definitions"""
+    for node in statements:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node
+        else:
+            for field in ('body', 'handlers', 'orelse', 'finalbody', 'cases'):
+                yield from _outer_defs(getattr(node, field, ()))
+
+def _complexity_blocks(tree):
+    """
+    Return (node, complexity) for the blocks radon's cc_visit reports, in its order:
+    module-level functions, then each class followed by its methods
+    """
+    outer = list(_outer_defs(tree.body))
+    blocks = [(node, _complexity(node)) for node in outer if not isinstance(node, ast.ClassDef)]
+    for cls in outer:
+        if not isinstance(cls, ast.ClassDef):
+            continue
+        methods = [(node, _complexity(node)) for node in _outer_defs(cls.body)
+                   if not isinstance(node, ast.ClassDef)]
+        # A class scores its own statements plus all its methods, averaged over the methods
+        real = _complexity(cls) + sum(complexity for _, complexity in methods)
+        complexity = int(real / len(methods)) + (len(methods) > 1) if methods else real
+        blocks.append((cls, complexity))
+        blocks.extend(methods)
+    return blocks
+
+def _complexity(definition):
+    visitor = _ComplexityVisitor()
+    for statement in definition.body:
+        visitor.visit(statement)
+    return visitor.complexity
+
+class _ComplexityVisitor(ast.NodeVisitor):
+    """Computes McCabe complexity of one definition's body, following radon's counting rules"""
+
+    def __init__(self):
+        self.complexity = 1
+
+    def _skip(self, node):
+        pass  # Nested definitions are scored on their own
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _skip
+
+    def _visit_branch(self, node):
+        self.complexity += 1
+        self.generic_visit(node)
+
+    visit_If = visit_IfExp = _visit_branch
+
+    def visit_Assert(self, node):
+        self.complexity += 1  # radon does not look inside the assert
+
+    def visit_Match(self, node):
+        # A wildcard case is the match's "else" and does not add a path
+        wildcard = any(getattr(case.pattern, 'pattern', False) is None for case in node.cases)
+        self.complexity += max(0, len(node.cases) - wildcard)
+        self.generic_visit(node)
+
+    def _visit_loop(self, node):
+        self.complexity += 1 + bool(node.orelse)
+        self.generic_visit(node)
+
+    visit_For = visit_AsyncFor = visit_While = _visit_loop
+
+    def visit_Try(self, node):
+        # try* blocks are not counted, as in radon
+        self.complexity += len(node.handlers) + bool(node.orelse)
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        self.complexity += len(node.values) - 1
+        self.generic_visit(node)
+
+    def visit_comprehension(self, node):
+        self.complexity += 1 + len(node.ifs)
+        self.generic_visit(node)
@@ -1,14 +1,71 @@
 from flask import Flask, request, render_template, send_file, jsonify, session
+from flask.json.provider import DefaultJSONProvider
+import multiprocessing
 import os
+import sys
 import tempfile
 import subprocess
-from analyzer import analyze_code
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from analyzer import analyze_code, analyze_code_batch, get_cached_analysis, warm_up
 from report_generator import generate_txt_report, generate_pdf_report, generate_command_txt_report, generate_command_pdf_report
 from command_analyzer import analyze_command
+import exec_pool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used for jsonify() and the session cookie"""
+
+    def dumps(self, obj, **kwargs):
+        # Analysis results carry int-keyed dicts (line_suggestions), which orjson rejects by default
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Required for session
-app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+def get_upload_folder():
+    # Created on first upload rather than at import, since pool workers re-import this module
+    if 'UPLOAD_FOLDER' not in app.config:
+        app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+    return app.config['UPLOAD_FOLDER']
+
+# Worker processes import pylint once and then serve many analyses; recycle them
+# periodically so astroid's memory use stays bounded
+ANALYSIS_MAX_TASKS_PER_WORKER = 100
+
+# Recycling rules out plain fork, so workers come from a forkserver that has imported
+# the analyzer (and with it pylint and astroid) once; each (re)started worker is forked
+# from it with those already loaded. Workers still re-import the main script, as under
+# spawn, which is why this module keeps its module-level setup cheap for them.
+# Platforms without forkserver (Windows) fall back to spawn.
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    ANALYSIS_CONTEXT = multiprocessing.get_context('forkserver')
+    ANALYSIS_CONTEXT.set_forkserver_preload(['analyzer'])
+else:
+    ANALYSIS_CONTEXT = multiprocessing.get_context('spawn')
+
+_analysis_pool = None
+
+def get_analysis_pool():
+    global _analysis_pool
+    if _analysis_pool is None:
+        pool_options = {}
+        if sys.version_info >= (3, 11):
+            pool_options['max_tasks_per_child'] = ANALYSIS_MAX_TASKS_PER_WORKER
+        _analysis_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=ANALYSIS_CONTEXT,
+                                             initializer=warm_up, **pool_options)
+    return _analysis_pool
 
 @app.route('/')
 def index():
@@ -20,13 +77,30 @@ def upload():
     if not files or files[0].filename == '':
         return jsonify({'error': 'No files uploaded'}), 400
 
-    results = []
+    filepaths = []
     for file in files:
         if file and file.filename.endswith('.py'):
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-            file.save(filepath)
-            result = analyze_code(filepath)
-            results.append(result)
+            filepath = os.path.join(get_upload_folder(), file.filename)
+            # Stream the upload to disk in 1 MiB chunks rather than werkzeug's 16 KiB default
+            file.save(filepath, buffer_size=UPLOAD_CHUNK_SIZE)
+            filepaths.append(filepath)
+
+    # Serve cache hits from this process, whose in-memory cache outlives the pool's
+    # recycled workers, and analyze only the misses concurrently in the worker pool
+    results = [get_cached_analysis(filepath) for filepath in filepaths]
+    misses = [index for index, result in enumerate(results) if result is None]
+    global _analysis_pool
+    try:
+        if misses:
+            pool = get_analysis_pool()
+            futures = {pool.submit(analyze_code, filepaths[index]): index for index in misses}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time and analyze here for now
+        _analysis_pool = None
+        for index, result in zip(misses, analyze_code_batch([filepaths[index] for index in misses])):
+            results[index] = result
 
     # Store results in session for report generation
     session['last_analysis_results'] = results
@@ -63,9 +137,8 @@ def run_code():
         return jsonify({'error': 'No code provided'}), 400
 
     try:
-        # Execute code in a subprocess with timeout for safety
-        result = subprocess.run(['python', '-c', code],
-                              capture_output=True, text=True, timeout=10)
+        # Execute code in a pooled worker process with timeout for safety
+        result = exec_pool.submit(code, timeout=10)
         output = result.stdout
         error = result.stderr
         return_code = result.returncode
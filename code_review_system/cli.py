@@ -6,97 +6,116 @@ Also supports command-line prompt analysis and code execution
 """
 
 import argparse
+import ast
+import re
 import sys
 import os
 import subprocess
-import tempfile
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from analyzer import analyze_code
+from analyzer import analyze_code, analyze_source, iter_defs, parse_code
 from command_analyzer import analyze_command
 from report_generator import generate_txt_report, generate_pdf_report
+import exec_pool
+
+# Used to suggest docstrings for source that does not parse
+DEF_RE = re.compile(r'^([ \t]*)(?:async[ \t]+)?(def|class)\s', re.M)
+# Tokens that matter when finding where a def/class header ends: string literals and
+# comments (skipped whole), line continuations, brackets, colons and newlines
+HEADER_TOKEN_RE = re.compile(r'''"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|#[^\n]*|\\\n|[()\[\]{}:\n]''')
+DOCSTRING_AFTER_RE = re.compile(r'(?:\n[ \t]*)*\n[ \t]*(?:"""|\'\'\')')
+
+COLORS = {
+    'red': '\033[91m',
+    'green': '\033[92m',
+    'yellow': '\033[93m',
+    'blue': '\033[94m',
+    'reset': '\033[0m'
+}
+
+def colorize(text, color):
+    """Wrap text in terminal color codes"""
+    return f"{COLORS.get(color, COLORS['reset'])}{text}{COLORS['reset']}"
 
 def print_colored(text, color):
     """Print colored text in terminal"""
-    colors = {
-        'red': '\033[91m',
-        'green': '\033[92m',
-        'yellow': '\033[93m',
-        'blue': '\033[94m',
-        'reset': '\033[0m'
-    }
-    print(f"{colors.get(color, colors['reset'])}{text}{colors['reset']}")
+    print(colorize(text, color))
 
 def display_analysis(result):
     """Display analysis results in CLI format"""
-    print(f"\n{'='*60}")
-    print(f"Code Review Analysis for: {result['filename']}")
-    print(f"Quality Score: {result['score']}/100")
-    print(f"{'='*60}\n")
+    # Render everything into one buffer and write it once instead of printing per line
+    out = [
+        f"\n{'='*60}\n",
+        f"Code Review Analysis for: {result['filename']}\n",
+        f"Quality Score: {result['score']}/100\n",
+        f"{'='*60}\n\n",
+    ]
 
     # Display issues summary
     if result['issues']:
-        print("ISSUES FOUND:")
+        out.append("ISSUES FOUND:\n")
         for issue in result['issues']:
             color = {'error': 'red', 'warning': 'yellow', 'info': 'blue'}.get(issue['type'], 'reset')
-            print_colored(f"  Line {issue['line']}: {issue['type'].upper()} - {issue['message']}", color)
-        print()
+            out.append(colorize(f"  Line {issue['line']}: {issue['type'].upper()} - {issue['message']}", color) + "\n")
+        out.append("\n")
     else:
-        print_colored("✓ No issues found!", 'green')
-        print()
+        out.append(colorize("✓ No issues found!", 'green') + "\n\n")
 
     # Display suggestions
     if result['suggestions']:
-        print("SUGGESTIONS:")
-        for suggestion in result['suggestions']:
-            print(f"  • {suggestion}")
-        print()
+        out.append("SUGGESTIONS:\n")
+        out.extend(f"  • {suggestion}\n" for suggestion in result['suggestions'])
+        out.append("\n")
 
     # Display code with line-by-line suggestions
-    print("SOURCE CODE WITH LINE-BY-LINE ANALYSIS:")
-    print("-" * 60)
+    out.append("SOURCE CODE WITH LINE-BY-LINE ANALYSIS:\n")
+    out.append("-" * 60 + "\n")
 
-    for i, line in enumerate(result['code_lines'], 1):
-        # Print line number and code
-        line_str = f"{i:3d}: {line.rstrip()}"
-        print(line_str)
+    colored_suggestions = {}
+    for line_number, suggestions in result['line_suggestions'].items():
+        colored_suggestions[line_number] = [
+            colorize(f"      → {suggestion}",
+                     {'ERROR': 'red', 'WARNING': 'yellow', 'INFO': 'blue'}.get(suggestion.split(':')[0], 'reset')) + "\n"
+            for suggestion in suggestions
+        ]
 
-        # Print suggestions for this line
-        if i in result['line_suggestions']:
-            for suggestion in result['line_suggestions'][i]:
-                color = {'ERROR': 'red', 'WARNING': 'yellow', 'INFO': 'blue'}.get(suggestion.split(':')[0], 'reset')
-                print_colored(f"      → {suggestion}", color)
+    for i, line in enumerate(result['code_lines'], 1):
+        out.append(f"{i:3d}: {line.rstrip()}\n")
+        out.extend(colored_suggestions.get(i, ()))
 
-    print(f"\n{'='*60}")
+    out.append(f"\n{'='*60}\n")
+    sys.stdout.write(''.join(out))
 
 def display_command_analysis(result):
     """Display command analysis results in CLI format"""
-    print(f"\n{'='*60}")
-    print(f"Command Analysis: {result['command'][:50]}{'...' if len(result['command']) > 50 else ''}")
-    print(f"Risk Level: {result['risk_level']}")
-    print(f"Issues: {result['total_issues']} | Suggestions: {result['total_suggestions']}")
-    print(f"{'='*60}\n")
+    out = [
+        f"\n{'='*60}\n",
+        f"Command Analysis: {result['command'][:50]}{'...' if len(result['command']) > 50 else ''}\n",
+        f"Risk Level: {result['risk_level']}\n",
+        f"Issues: {result['total_issues']} | Suggestions: {result['total_suggestions']}\n",
+        f"{'='*60}\n\n",
+    ]
 
     # Display issues
     if result['issues']:
-        print("ISSUES FOUND:")
+        out.append("ISSUES FOUND:\n")
         for issue in result['issues']:
             risk_color = {'CRITICAL': 'red', 'HIGH': 'red', 'MEDIUM': 'yellow', 'LOW': 'blue'}.get(issue.get('risk', 'LOW'), 'reset')
-            print_colored(f"  [{issue.get('risk', 'LOW')}] {issue['type']}: {issue['message']}", risk_color)
+            out.append(colorize(f"  [{issue.get('risk', 'LOW')}] {issue['type']}: {issue['message']}", risk_color) + "\n")
             if 'command_part' in issue:
-                print_colored(f"      → Problematic part: {issue['command_part']}", 'yellow')
-        print()
+                out.append(colorize(f"      → Problematic part: {issue['command_part']}", 'yellow') + "\n")
+        out.append("\n")
 
     # Display suggestions
     if result['suggestions']:
-        print("SUGGESTIONS:")
-        for suggestion in result['suggestions']:
-            print(f"  • {suggestion}")
-        print()
+        out.append("SUGGESTIONS:\n")
+        out.extend(f"  • {suggestion}\n" for suggestion in result['suggestions'])
+        out.append("\n")
 
-    print(f"{'='*60}")
+    out.append(f"{'='*60}\n")
+    sys.stdout.write(''.join(out))
 
 def execute_code_cli(code):
     """Execute Python code in CLI and display results with analysis"""
@@ -114,51 +133,41 @@ def execute_code_cli(code):
     print("\nCODE ANALYSIS:")
     print("-" * 40)
 
-    # Create temporary file for analysis
-    import tempfile
-    import os
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-        f.write(code)
-        temp_file = f.name
+    # Analyze the code straight from memory
+    analysis_result = analyze_source(code)
+
+    if analysis_result['issues']:
+        print("ISSUES FOUND:")
+        for issue in analysis_result['issues']:
+            color = {'error': 'red', 'warning': 'yellow', 'info': 'blue'}.get(issue['type'], 'reset')
+            print_colored(f"  Line {issue['line']}: {issue['type'].upper()} - {issue['message']}", color)
+    else:
+        print_colored("✓ No issues found in the code!", 'green')
+
+    print(f"\nQuality Score: {analysis_result['score']}/100")
+
+    if analysis_result['suggestions']:
+        print("\nSUGGESTIONS:")
+        for suggestion in analysis_result['suggestions']:
+            print(f"  • {suggestion}")
+
+    # Terminal 2: Corrected/Suggested Code
+    print(f"\n{'='*80}")
+    print("TERMINAL 2 - SUGGESTED CORRECTIONS:")
+    print("-" * 40)
 
+    # Reuses the tree the analyzer already built for this source
     try:
-        # Analyze the code
-        analysis_result = analyze_code(temp_file)
-
-        if analysis_result['issues']:
-            print("ISSUES FOUND:")
-            for issue in analysis_result['issues']:
-                color = {'error': 'red', 'warning': 'yellow', 'info': 'blue'}.get(issue['type'], 'reset')
-                print_colored(f"  Line {issue['line']}: {issue['type'].upper()} - {issue['message']}", color)
-        else:
-            print_colored("✓ No issues found in the code!", 'green')
-
-        print(f"\nQuality Score: {analysis_result['score']}/100")
-
-        if analysis_result['suggestions']:
-            print("\nSUGGESTIONS:")
-            for suggestion in analysis_result['suggestions']:
-                print(f"  • {suggestion}")
-
-        # Terminal 2: Corrected/Suggested Code
-        print(f"\n{'='*80}")
-        print("TERMINAL 2 - SUGGESTED CORRECTIONS:")
-        print("-" * 40)
-
-        corrected_code = generate_corrected_code(code, analysis_result)
-        if corrected_code != code:
-            print(corrected_code)
-        else:
-            print("No corrections needed - code follows best practices!")
-
-        print("-" * 40)
-
-    finally:
-        # Clean up temp file
-        try:
-            os.unlink(temp_file)
-        except:
-            pass
+        tree = parse_code(code)
+    except SyntaxError:
+        tree = None
+    corrected_code = insert_missing_docstrings(code, tree)
+    if corrected_code != code:
+        print(corrected_code)
+    else:
+        print("No corrections needed - code follows best practices!")
+
+    print("-" * 40)
 
     # Terminal 3: Execution Results
     print(f"\n{'='*80}")
@@ -166,9 +175,8 @@ def execute_code_cli(code):
     print("-" * 40)
 
     try:
-        # Execute code in a subprocess with timeout for safety
-        result = subprocess.run(['python', '-c', code],
-                              capture_output=True, text=True, timeout=10)
+        # Execute code in a pooled worker process with timeout for safety
+        result = exec_pool.submit(code, timeout=10)
 
         if result.stdout:
             print("STDOUT:")
@@ -187,51 +195,93 @@ def execute_code_cli(code):
 
     print(f"\n{'='*80}")
 
-def generate_corrected_code(original_code, analysis_result):
-    """Generate corrected version of the code based on analysis"""
-    corrected_code = original_code
-
-    # Apply basic corrections based on issues found
-    for issue in analysis_result['issues']:
-        if 'snake_case' in issue['message'].lower():
-            # Simple snake_case correction (basic implementation)
-            if 'Function name' in issue['message']:
-                # This is a simplified correction - in practice, you'd need more sophisticated parsing
-                pass
-        elif 'PascalCase' in issue['message'].lower():
-            # Simple PascalCase correction
-            pass
-
-    # Add docstrings if missing
-    lines = corrected_code.split('\n')
+def insert_missing_docstrings(source, tree):
+    """Insert placeholder docstrings into functions and classes that lack one"""
+    if tree is None:
+        # Source does not parse, so fall back to scanning lines for def/class headers
+        return _insert_missing_docstrings_by_lines(source)
+
+    lines = source.split('\n')
+    insertions = []
+    for node in iter_defs(tree):
+        if ast.get_docstring(node) is not None:
+            continue
+        first = node.body[0]
+        # A decorated def/class starts at its first decorator, not at its own lineno
+        start = min([first.lineno] + [d.lineno for d in getattr(first, 'decorator_list', [])])
+        line = lines[start - 1]
+        if line[:first.col_offset].strip():
+            continue  # Body shares a line with the header, e.g. "def f(): pass"
+        indent = line[:len(line) - len(line.lstrip())]
+        label = 'Class description.' if isinstance(node, ast.ClassDef) else 'Function description.'
+        insertions.append((start - 1, [indent + '"""', indent + label, indent + '"""']))
+
+    # Splice every docstring in with one left-to-right pass over the lines
     corrected_lines = []
-
-    for i, line in enumerate(lines):
-        corrected_lines.append(line)
-
-        # Check if this is a function/class definition without docstring
-        stripped = line.strip()
-        if stripped.startswith('def ') or stripped.startswith('class '):
-            # Check if next non-empty line is a docstring
-            has_docstring = False
-            for j in range(i + 1, len(lines)):
-                next_line = lines[j].strip()
-                if next_line and not next_line.startswith(' ') and not next_line.startswith('\t'):
-                    break
-                if next_line.startswith('"""') or next_line.startswith("'''"):
-                    has_docstring = True
-                    break
-
-            if not has_docstring:
-                indent = len(line) - len(line.lstrip())
-                corrected_lines.append(' ' * indent + '    """')
-                if stripped.startswith('def '):
-                    corrected_lines.append(' ' * indent + '    Function description.')
-                else:
-                    corrected_lines.append(' ' * indent + '    Class description.')
-                corrected_lines.append(' ' * indent + '    """')
-
-    return '\n'.join(corrected_lines)
+    position = 0
+    for index, docstring_lines in sorted(insertions):
+        corrected_lines.extend(lines[position:index])
+        corrected_lines.extend(docstring_lines)
+        position = index
+    corrected_lines.extend(lines[position:])
+
+    corrected = '\n'.join(corrected_lines)
+    try:
+        ast.parse(corrected)
+    except SyntaxError:
+        return source  # Never suggest code that is more broken than what we were given
+    return corrected
+
+def _find_header_end(source, start, limit):
+    """
+    Find the end of the def/class header starting at start
+
+    The header is one logical line, so a multi-line signature is followed through
+    its brackets and continuations but the search never runs into the next statement.
+    It also stops at limit (the next def/class), so a bracket left open does not
+    send every header's scan to the end of the file.
+
+    Returns:
+        tuple: (index just past the header's ':' or None, index where the logical line ends)
+    """
+    depth = 0
+    colon = None
+    for token in HEADER_TOKEN_RE.finditer(source, start, limit):
+        text = token.group()
+        if text in ('(', '[', '{'):
+            depth += 1
+        elif text in (')', ']', '}'):
+            depth = max(0, depth - 1)
+        elif text == ':' and depth == 0 and colon is None:
+            colon = token.end()
+        elif text == '\n' and depth == 0:
+            return colon, token.start()
+    return colon, limit
+
+def _insert_missing_docstrings_by_lines(source):
+    # One regex pass over the whole source instead of a nested per-line scan
+    pieces = []
+    position = 0
+    matches = list(DEF_RE.finditer(source))
+    for match, following in zip(matches, matches[1:] + [None]):
+        limit = following.start() if following else len(source)
+        colon, line_end = _find_header_end(source, match.end(), limit)
+        if colon is None:
+            continue
+        rest = source[colon:line_end].strip()
+        if rest and not rest.startswith('#'):
+            continue  # Body shares a line with the header, e.g. "def f(): pass"
+        if line_end <= position or DOCSTRING_AFTER_RE.match(source, line_end):
+            continue
+
+        indent = match.group(1) + '    '
+        label = 'Function description.' if match.group(2) == 'def' else 'Class description.'
+        pieces.append(source[position:line_end])
+        pieces.append(f'\n{indent}"""\n{indent}{label}\n{indent}"""')
+        position = line_end
+
+    pieces.append(source[position:])
+    return ''.join(pieces)
 
 def main():
     parser = argparse.ArgumentParser(description='Automated Code Review CLI Tool')
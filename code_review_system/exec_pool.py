@@ -0,0 +1,221 @@
+"""
+Code Execution Pool
+Runs user code snippets from long-lived Python worker processes so each run
+does not pay interpreter start-up. A worker forks a fresh child per snippet,
+so no state carries over from one run to the next. Workers talk to the parent
+over their stdin/stdout pipes using length-prefixed frames.
+"""
+
+import atexit
+import json
+import os
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+import types
+
+POOL_SIZE = min(4, os.cpu_count() or 1)
+
+# Without fork() (e.g. on Windows) every snippet gets its own interpreter instead
+FORK_AVAILABLE = hasattr(os, 'fork')
+
+_HEADER = struct.Struct('>I')
+
+def _read_exact(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def _read_frame(stream):
+    header = _read_exact(stream, _HEADER.size)
+    if header is None:
+        return None
+    return _read_exact(stream, _HEADER.unpack(header)[0])
+
+def _write_frame(stream, payload):
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+class _Worker:
+    def __init__(self):
+        self.process = subprocess.Popen([sys.executable, '-u', os.path.abspath(__file__)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, start_new_session=True)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        # The worker leads its own process group, so this also takes down the snippet's child
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def run(self, code, timeout):
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            _write_frame(self.process.stdin, code.encode('utf-8'))
+            response = _read_frame(self.process.stdout)
+        except (BrokenPipeError, OSError):
+            response = None
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(['python', '-c', code], timeout)
+        if response is None:
+            # The worker died under us; report its exit status like a crashed snippet
+            return '', '', self.process.wait()
+        return json.loads(response.decode('utf-8'))
+
+    def close(self):
+        if self.process.poll() is None:
+            self.kill()
+        self.process.wait()
+
+_idle_workers = []
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+def _acquire():
+    _slots.acquire()
+    with _lock:
+        while _idle_workers:
+            worker = _idle_workers.pop()
+            if worker.alive():
+                return worker
+            worker.close()
+    try:
+        return _Worker()
+    except BaseException:
+        _slots.release()
+        raise
+
+def _release(worker):
+    with _lock:
+        _idle_workers.append(worker)
+    _slots.release()
+
+@atexit.register
+def _shutdown():
+    with _lock:
+        while _idle_workers:
+            _idle_workers.pop().close()
+
+def submit(code, timeout=10):
+    """
+    Run a Python snippet in a pooled worker process
+
+    Args:
+        code (str): Python source to execute as __main__
+        timeout (float): Seconds before the worker is killed
+
+    Returns:
+        subprocess.CompletedProcess: stdout, stderr and returncode of the run
+
+    Raises:
+        subprocess.TimeoutExpired: If the snippet runs longer than timeout
+    """
+    if not FORK_AVAILABLE:
+        return subprocess.run([sys.executable, '-c', code],
+                              capture_output=True, text=True, timeout=timeout)
+
+    worker = _acquire()
+    try:
+        stdout, stderr, returncode = worker.run(code, timeout)
+    except BaseException:
+        worker.close()
+        _slots.release()
+        raise
+    if worker.alive():
+        _release(worker)
+    else:
+        worker.close()
+        _slots.release()
+    return subprocess.CompletedProcess(['python', '-c', code], returncode, stdout, stderr)
+
+def _execute(code):
+    """Run a snippet as __main__ in this (forked) process, the way python -c would"""
+    # A real __main__ module, so pickle, multiprocessing and "import __main__" find the
+    # snippet's globals; argv and path[0] are what python -c sets up
+    main = types.ModuleType('__main__')
+    sys.modules['__main__'] = main
+    sys.argv = ['-c']
+    sys.path[0] = ''
+    returncode = 0
+    try:
+        exec(compile(code, '<string>', 'exec'), main.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException:
+        etype, value, tb = sys.exc_info()
+        # Drop this frame so the traceback starts at the user's code, as with python -c
+        traceback.print_exception(etype, value, tb.tb_next)
+        returncode = 1
+    return returncode
+
+def _drain(stream):
+    stream.seek(0)
+    data = stream.read()
+    stream.seek(0)
+    stream.truncate()
+    return data.decode('utf-8', 'replace')
+
+def _serve():
+    # Keep private copies of the protocol pipes and point fds 0/1 at /dev/null,
+    # so snippets that touch the raw file descriptors cannot corrupt the framing
+    requests = os.fdopen(os.dup(0), 'rb')
+    responses = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    # Each child writes its fds 1/2 here, so output from os.write and from
+    # processes the snippet spawns is captured too
+    stdout = tempfile.TemporaryFile()
+    stderr = tempfile.TemporaryFile()
+
+    while True:
+        payload = _read_frame(requests)
+        if payload is None:
+            return
+        pid = os.fork()
+        if pid == 0:
+            returncode = 1
+            try:
+                requests.close()
+                responses.close()
+                os.dup2(stdout.fileno(), 1)
+                os.dup2(stderr.fileno(), 2)
+                returncode = _execute(payload.decode('utf-8'))
+                for stream in (sys.stdout, sys.stderr):
+                    stream.flush()
+            finally:
+                os._exit(returncode & 0xFF)
+        returncode = os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+        result = (_drain(stdout), _drain(stderr), returncode)
+        _write_frame(responses, json.dumps(result).encode('utf-8'))
+
+if __name__ == '__main__':
+    _serve()